@@ -0,0 +1,73 @@
+import logging
+import os
+from anyio import from_thread
+from fastapi_cache import FastAPICache, default_key_builder
+from fastapi_cache.backends.inmemory import InMemoryBackend
+from fastapi_cache.backends.redis import RedisBackend
+from redis import asyncio as aioredis
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.datastructures import MutableHeaders
+
+logger = logging.getLogger(__name__)
+
+def no_db_session_key_builder(func, namespace: str = "", *, request=None, response=None, args=(), kwargs=None):
+    # the Session object differs on every request, keep it out of the key
+    kwargs = {k: v for k, v in (kwargs or {}).items() if k != "db"}
+    return default_key_builder(func, namespace, request=request, response=response, args=args, kwargs=kwargs)
+
+def init_cache():
+    # read at startup (not import) so the values from the env file apply
+    redis_url = os.getenv("REDIS_URL")
+    expire = int(os.getenv("CACHE_EXPIRE", "30")) # seconds a cached GET response lives
+    if redis_url:
+        backend = RedisBackend(aioredis.from_url(redis_url))
+        FastAPICache.init(backend, prefix="api", expire=expire, key_builder=no_db_session_key_builder)
+    else:
+        # no Redis configured (dev/test): the decorators stay but nothing is cached
+        FastAPICache.init(InMemoryBackend(), prefix="api", expire=expire, key_builder=no_db_session_key_builder, enable=False)
+
+def clear_namespaces(*namespaces: str):
+    """
+    Drop cached responses for the given namespaces,
+    called from sync code (which runs in the threadpool)
+    """
+    if not FastAPICache.get_enable():
+        return
+    for namespace in namespaces:
+        try:
+            from_thread.run(FastAPICache.clear, namespace)
+        except Exception:
+            # the write is already committed, a cache outage must not turn it into a 500
+            logger.warning("could not clear cache namespace %r", namespace, exc_info=True)
+
+def invalidate(db: Session, *namespaces: str):
+    """
+    Clear the namespaces once db commits, so a concurrent read
+    can't re-cache the old rows in between
+    """
+    event.listen(db, "after_commit", lambda _: clear_namespaces(*namespaces), once=True)
+
+
+class RevalidateCachedResponses:
+    """
+    fastapi-cache sends Cache-Control: max-age=<expire>, so browsers would keep
+    showing a response after a write cleared it server side; send no-cache
+    instead so they revalidate (a matching ETag still gets a 304)
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_revalidate(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                if "x-fastapi-cache" in headers:
+                    headers["cache-control"] = "no-cache"
+            await send(message)
+
+        await self.app(scope, receive, send_revalidate)
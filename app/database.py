@@ -1,8 +1,9 @@
 import os, time
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, make_url, text
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import StaticPool
 
 # Pick env file by APP_ENV (default dev)
 envfile = {
@@ -18,26 +19,98 @@ DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db") # default to loca
 SQL_ECHO = os.getenv("SQL_ECHO", "false").lower() == "true" # enable sql echo with env varl loggin if its true
 RETRIES = int(os.getenv("DB_RETRIES", "10"))
 DELAY = float(os.getenv("DB_RETRY_DELAY", "1.5"))
+RUN_MIGRATIONS = os.getenv("APP_RUN_MIGRATIONS", "true").lower() == "true" # set false where the schema is managed outside the app
 
-connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "30"))
+
+is_sqlite = DATABASE_URL.startswith("sqlite")
+
+# busy timeout so concurrent writers wait on the file lock instead of failing
+connect_args = {"check_same_thread": False, "timeout": 30} if is_sqlite else {}
+
+# pool sizing for server databases (SQLite keeps SQLAlchemy's defaults)
+pool_kwargs = {} if is_sqlite else {
+    "pool_size": POOL_SIZE,
+    "max_overflow": MAX_OVERFLOW,
+    "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "3600")),
+    "pool_use_lifo": True,  # reuse the most recently returned connection
+}
+# an in-memory SQLite database only exists on its one connection
+if is_sqlite and make_url(DATABASE_URL).database in (None, "", ":memory:"):
+    pool_kwargs["poolclass"] = StaticPool
+
+# create the SQLAlchemy engine once; connections are opened lazily and
+# pool_pre_ping validates them on checkout (skipped for SQLite, a local file
+# has no connection to lose). A larger compiled-statement cache keeps every
+# route's SQL compiled, and multi-row inserts are batched 1000 rows per
+# INSERT ... VALUES statement
+engine = create_engine(
+    DATABASE_URL,
+    pool_pre_ping=not is_sqlite,
+    echo=SQL_ECHO,
+    connect_args=connect_args,
+    query_cache_size=1200,
+    insertmanyvalues_page_size=1000,
+    **pool_kwargs,
+)
+
+# per-connection SQLite settings: enforce foreign keys, WAL so reads don't
+# block on writes, no fsync per commit (NORMAL is safe under WAL), temp
+# tables in memory, 256MB memory-mapped reads and a 64MB page cache
+if is_sqlite:
+    @event.listens_for(engine, "connect")
+    def _sqlite_pragmas(dbapi_conn, _):
+        cur = dbapi_conn.cursor()
+        cur.execute("PRAGMA foreign_keys=ON")
+        cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute("PRAGMA synchronous=NORMAL")
+        cur.execute("PRAGMA temp_store=MEMORY")
+        cur.execute("PRAGMA mmap_size=268435456")
+        cur.execute("PRAGMA cache_size=-64000")
+        cur.close()
+
+# worker threads for sync routes; defaults to the pool capacity we configure
+# (size + overflow) so the threadpool is never a tighter limit than the
+# connections it can use. None (SQLite) keeps anyio's default
+threadpool_env = os.getenv("THREADPOOL_SIZE")
+if threadpool_env:
+    THREADPOOL_SIZE = int(threadpool_env)
+else:
+    THREADPOOL_SIZE = POOL_SIZE + MAX_OVERFLOW if not is_sqlite else None
 
-# small retry (harmless for SQLite, useful for Postgres)
-for _ in range(RETRIES):
-    try:
-        # create the SQLAlchemy engine
-        engine = create_engine(DATABASE_URL, pool_pre_ping=True, echo=SQL_ECHO, connect_args=connect_args)
-        with engine.connect():  # smoke test connection
-            pass
-        break
-    except OperationalError:
-        time.sleep(DELAY)
-        
 # create a local session
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False, expire_on_commit=False)
+# sessions for read-only routes; on Postgres their transactions are READ ONLY
+# (the option is ignored by SQLite and reset when the connection is returned)
+ReadOnlySessionLocal = sessionmaker(bind=engine.execution_options(postgresql_readonly=True), autocommit=False, autoflush=False, expire_on_commit=False)
+
+def wait_for_db():
+    # small retry at startup (harmless for SQLite, useful for Postgres)
+    for _ in range(RETRIES):
+        try:
+            with engine.connect() as conn:  # smoke test connection
+                conn.execute(text("SELECT 1"))
+            return
+        except OperationalError:
+            time.sleep(DELAY)
+
+def get_db_ro():
+    db = ReadOnlySessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
 
-def get_db():
+def get_db_rw():
+    # commits once the route has returned, rolls back if it raised
     db = SessionLocal()
     try:
         yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
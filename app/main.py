@@ -1,85 +1,142 @@
+import os
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Depends, HTTPException, status, Response
+import anyio
+from fastapi import FastAPI, Depends, HTTPException, Query, status, Response
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import engine
-from app.models import Base
-from sqlalchemy import select
+from fastapi.responses import ORJSONResponse
+from fastapi_cache.decorator import cache
+from pydantic import TypeAdapter
+from sqlalchemy import exists, select, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm import Session, raiseload, selectinload
 
-from .database import engine, SessionLocal
+from .cache import RevalidateCachedResponses, init_cache, invalidate
+from .database import engine, get_db_ro, get_db_rw, wait_for_db, RUN_MIGRATIONS, THREADPOOL_SIZE
 from .models import Base, UserDB, CourseDB, ProjectDB
 from .schemas import (
-    UserCreate, UserRead,
+    UserCreate, UserRead, UserPatch,
     CourseCreate, CourseRead,
-    ProjectCreate, ProjectRead,
+    ProjectCreate, ProjectRead, ProjectPatch,
     ProjectReadWithOwner, ProjectCreateForUser
 )
 
 #Replacing @app.on_event("startup")
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    Base.metadata.create_all(bind=engine)   
+    wait_for_db()
+    if RUN_MIGRATIONS:
+        Base.metadata.create_all(bind=engine)
+        # create_all skips tables that already exist, so add indexes
+        # introduced since then to those tables too
+        for index in ProjectDB.__table__.indexes:
+            index.create(bind=engine, checkfirst=True)
+    init_cache()
+    # sync routes run on anyio's threadpool (40 threads by default)
+    if THREADPOOL_SIZE:
+        anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
     yield
 
-app = FastAPI(lifespan=lifespan)
+# orjson renders response bodies in C instead of the stdlib json encoder
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
-# CORS (add this block)
+# CORS: explicit allow-list (comma separated CORS_ORIGINS) so the middleware
+# does exact matches, browsers may cache the preflight for a day
+CORS_ORIGINS = [origin.strip() for origin in os.getenv("CORS_ORIGINS", "").split(",") if origin.strip()]
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],   # dev-friendly; tighten in prod
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=CORS_ORIGINS,
+    allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE"],
+    allow_headers=["authorization", "content-type"],
+    max_age=86400,
 )
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+app.add_middleware(RevalidateCachedResponses)
+
+# scope="function" closes the session once the response is serialized,
+# so the connection goes back to the pool before the response is sent;
+# write routes get a session that commits at that point
+ReadSession = Depends(get_db_ro, scope="function")
+WriteSession = Depends(get_db_rw, scope="function")
+
+# list endpoints select only the columns their response models need; the rows
+# come back as plain mappings, so no ORM objects (or lazy loads) are involved
+PROJECT_COLUMNS = (ProjectDB.id, ProjectDB.name, ProjectDB.description, ProjectDB.owner_id)
+USER_COLUMNS = (UserDB.id, UserDB.name, UserDB.email, UserDB.age, UserDB.student_id)
+# whole pages are validated in one pydantic-core call instead of row by row
+PROJECT_LIST = TypeAdapter(list[ProjectRead])
+USER_LIST = TypeAdapter(list[UserRead])
+MAX_PAGE_SIZE = 500 # upper bound for the limit query param on list endpoints
+
+# statements built once at import; routes only add where/limit/offset, which
+# are bound parameters, so every request reuses the same compiled SQL
+LIST_COURSES_STMT = select(CourseDB).options(raiseload("*")).order_by(CourseDB.id)
+LIST_PROJECTS_STMT = select(*PROJECT_COLUMNS).order_by(ProjectDB.id)
+LIST_USERS_STMT = select(*USER_COLUMNS).order_by(UserDB.id)
+PROJECT_WITH_OWNER_STMT = select(ProjectDB).options(selectinload(ProjectDB.owner), raiseload("*"))
 
 @app.get("/health")
-def health():
+async def health():
     return {"status": "ok"}
 
-def commit_or_rollback(db: Session, error_msg: str):
+def flush_or_rollback(db: Session, error_msg: str):
+    # write pending objects now so constraint errors map to 409 here,
+    # get_db_rw commits after the route returns
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=error_msg)
+
+def user_exists(db: Session, user_id: int) -> bool:
+    # SELECT EXISTS(...) instead of loading the whole user row
+    return db.execute(select(exists().where(UserDB.id == user_id))).scalar()
+
+def insert_or_ignore(db: Session, model):
+    """
+    INSERT ... ON CONFLICT DO NOTHING for the bound database,
+    a duplicate unique column inserts (and returns) no row instead of raising
+    """
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    return dialect.insert(model).on_conflict_do_nothing()
+
+def execute_or_rollback(db: Session, stmt, error_msg: str):
     try:
-        db.commit()
+        return db.execute(stmt)
     except IntegrityError:
         db.rollback()
         raise HTTPException(status_code=409, detail=error_msg)
 
     
 @app.post("/api/courses", response_model=CourseRead, status_code=201, summary="You could add details")
-def create_course(course: CourseCreate, db: Session = Depends(get_db)):
+def create_course(course: CourseCreate, db: Session = WriteSession):
     """
     Create a new course entry,
     fails if a course exists already with the same unique fields
     """
-    db_course = CourseDB(**course.model_dump())
-    db.add(db_course)
-    commit_or_rollback(db, "Course already exists")
-    db.refresh(db_course)
+    stmt = insert_or_ignore(db, CourseDB).values(**course.model_dump()).returning(CourseDB)
+    db_course = db.execute(stmt).scalar_one_or_none()
+    if db_course is None:
+        raise HTTPException(status_code=409, detail="Course already exists")
+    invalidate(db, "courses")
     return db_course
 
 @app.get("/api/courses", response_model=list[CourseRead])
-def list_courses(limit: int = 10, offset: int = 0, db: Session = Depends(get_db)):
+@cache(namespace="courses")
+def list_courses(limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE), offset: int = Query(0, ge=0), db: Session = ReadSession):
     """
     Get a list of all courses,
     """
-    stmt = select(CourseDB).order_by(CourseDB.id).limit(limit).offset(offset)
+    stmt = LIST_COURSES_STMT.limit(limit).offset(offset)
     return db.execute(stmt).scalars().all()
 
 # -------------- Projects --------------
 @app.post("/api/projects", response_model=ProjectRead, status_code=201)
-def create_project(project: ProjectCreate, db: Session = Depends(get_db)):
+def create_project(project: ProjectCreate, db: Session = WriteSession):
     """
     Create a new project for a given user,
     ensures the user exists before creating a project
     """
-    user = db.get(UserDB, project.owner_id)
-    if not user:
+    if not user_exists(db, project.owner_id):
         raise HTTPException(status_code=404, detail="User not found")
     proj = ProjectDB(
         name=project.name,
@@ -87,70 +144,60 @@ def create_project(project: ProjectCreate, db: Session = Depends(get_db)):
         owner_id=project.owner_id,
     )
     db.add(proj)
-    commit_or_rollback(db, "Project creation failed")
-    db.refresh(proj)
+    flush_or_rollback(db, "Project creation failed")
+    invalidate(db, "projects")
     return proj
 
 @app.get("/api/projects", response_model=list[ProjectRead])
-def list_projects(db: Session = Depends(get_db)):
-    stmt = select(ProjectDB).order_by(ProjectDB.id)
-    return db.execute(stmt).scalars().all()
+def list_projects(limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE), offset: int = Query(0, ge=0), db: Session = ReadSession):
+    stmt = LIST_PROJECTS_STMT.limit(limit).offset(offset)
+    return PROJECT_LIST.validate_python(db.execute(stmt).mappings().all())
 
 @app.get("/api/projects/{project_id}", response_model=ProjectReadWithOwner)
-def get_project_with_owner(project_id: int, db: Session = Depends(get_db)):
+@cache(namespace="projects")
+def get_project_with_owner(project_id: int, db: Session = ReadSession):
     """
     Get a single project by id and return its details with the owners,
-    selectionload loads the owner relationship
+    selectionload loads the owner relationship, raiseload blocks any other lazy load
     """
-    stmt = select(ProjectDB).where(ProjectDB.id == project_id).options(selectinload(ProjectDB.owner))
+    stmt = PROJECT_WITH_OWNER_STMT.where(ProjectDB.id == project_id)
     proj = db.execute(stmt).scalar_one_or_none()
     if not proj:
         raise HTTPException(status_code=404, detail="Project not found")
     return proj
 
 @app.put("/api/projects/{project_id}", response_model=ProjectRead, status_code=status.HTTP_200_OK)
-def update_project(project_id: int, project: ProjectCreate, db: Session = Depends(get_db)):
+def update_project(project_id: int, project: ProjectCreate, db: Session = WriteSession):
     """
     Fully update a projects fields,
-    requires all fields(not partial)
+    requires all fields(not partial),
+    single UPDATE ... RETURNING, an unknown owner_id fails the foreign key (409)
     """
-    proj = db.get(ProjectDB, project_id)
+    stmt = update(ProjectDB).where(ProjectDB.id == project_id).values(**project.model_dump()).returning(ProjectDB)
+    proj = execute_or_rollback(db, stmt, "Project update failed").scalar_one_or_none()
     if not proj:
         raise HTTPException(status_code=404, detail="Project not found")
-
-    owner = db.get(UserDB, project.owner_id)
-    if not owner:
-        raise HTTPException(status_code=404, detail="Owner user not found")
-
-
-    for field, value in project.model_dump().items():
-        setattr(proj, field, value)
-
-    commit_or_rollback(db, "Project update failed")
-    db.refresh(proj)
+    invalidate(db, "projects")
     return proj
 
 @app.patch("/api/projects/{project_id}", response_model=ProjectRead, status_code=status.HTTP_200_OK)
-def patch_project(project_id: int, partial_project: dict, db: Session = Depends(get_db)):
+def patch_project(project_id: int, partial_project: ProjectPatch, db: Session = WriteSession):
     """
-    Partially update a projects fields
+    Partially update a projects fields,
+    only the fields present in the request are written
     """
-    proj = db.get(ProjectDB, project_id)
+    values = partial_project.model_dump(exclude_unset=True)
+    if not values:
+        proj = db.get(ProjectDB, project_id)
+        if not proj:
+            raise HTTPException(status_code=404, detail="Project not found")
+        return proj
+
+    stmt = update(ProjectDB).where(ProjectDB.id == project_id).values(**values).returning(ProjectDB)
+    proj = execute_or_rollback(db, stmt, "Project partial update failed").scalar_one_or_none()
     if not proj:
         raise HTTPException(status_code=404, detail="Project not found")
-
-    if "owner_id" in partial_project: # if the owner exists in the object
-        owner = db.get(UserDB, partial_project["owner_id"])
-        if not owner:
-            raise HTTPException(status_code=404, detail="Owner user not found")
-
-    #update each field that is in the json request
-    for field, value in partial_project.items():
-        if hasattr(proj, field):
-            setattr(proj, field, value)
-
-    commit_or_rollback(db, "Project partial update failed")
-    db.refresh(proj)
+    invalidate(db, "projects")
     return proj
 
 
@@ -158,18 +205,17 @@ def patch_project(project_id: int, partial_project: dict, db: Session = Depends(
 
 #Nested Routes
 @app.get("/api/users/{user_id}/projects", response_model=list[ProjectRead])
-def get_user_projects(user_id: int, db: Session = Depends(get_db)):
-    stmt = select(ProjectDB).where(ProjectDB.owner_id == user_id)
+def get_user_projects(user_id: int, limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE), offset: int = Query(0, ge=0), db: Session = ReadSession):
+    # ordered by id so the (owner_id, id) index serves both filter and sort
+    stmt = LIST_PROJECTS_STMT.where(ProjectDB.owner_id == user_id).limit(limit).offset(offset)
     #space it out for debugging
     result = db.execute(stmt)
-    rows = result.scalars().all()
-    return rows
-    #return db.execute(stmt).scalars().all()
+    rows = result.mappings().all()
+    return PROJECT_LIST.validate_python(rows)
 
 @app.post("/api/users/{user_id}/projects", response_model=ProjectRead, status_code=201)
-def create_user_project(user_id: int, project: ProjectCreateForUser, db: Session = Depends(get_db)):
-    user = db.get(UserDB, user_id)
-    if not user:
+def create_user_project(user_id: int, project: ProjectCreateForUser, db: Session = WriteSession):
+    if not user_exists(db, user_id):
         raise HTTPException(status_code=404, detail="User not found")
 
     proj = ProjectDB(
@@ -178,84 +224,86 @@ def create_user_project(user_id: int, project: ProjectCreateForUser, db: Session
         owner_id=user_id
     )
     db.add(proj)
-    commit_or_rollback(db, "Project creation failed")
-    db.refresh(proj)
+    flush_or_rollback(db, "Project creation failed")
+    invalidate(db, "projects")
     return proj
 
 
 
 @app.get("/api/users", response_model=list[UserRead])
-def list_users(db: Session = Depends(get_db)):
-    stmt = select(UserDB).order_by(UserDB.id)
+@cache(namespace="users")
+def list_users(limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE), offset: int = Query(0, ge=0), db: Session = ReadSession):
+    stmt = LIST_USERS_STMT.limit(limit).offset(offset)
     #Useful for debugging
     result = db.execute(stmt)
-    users = result.scalars().all()
-    return users
-    #return list(db.execute(stmt).scalars())
+    users = result.mappings().all()
+    return USER_LIST.validate_python(users)
 
 
 @app.get("/api/users/{user_id}", response_model=UserRead)
-def get_user(user_id: int, db: Session = Depends(get_db)):
+@cache(namespace="users")
+def get_user(user_id: int, db: Session = ReadSession):
     user = db.get(UserDB, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
 @app.post("/api/users", response_model=UserRead, status_code=status.HTTP_201_CREATED)
-def add_user(payload: UserCreate, db: Session = Depends(get_db)):
+def add_user(payload: UserCreate, db: Session = WriteSession):
     """
     Create a new user,
-    automatically commits and refreshes the object 
+    a duplicate email or student_id inserts nothing and returns 409
     """
-    user = UserDB(**payload.model_dump())
-    db.add(user)
-    try:
-        db.commit()
-        db.refresh(user)
-    except IntegrityError:
-        db.rollback()
+    stmt = insert_or_ignore(db, UserDB).values(**payload.model_dump()).returning(UserDB)
+    user = db.execute(stmt).scalar_one_or_none()
+    if user is None:
         raise HTTPException(status_code=409, detail="User already exists")
+    invalidate(db, "users")
     return user
 
 # DELETE a user (triggers ORM cascade -> deletes their projects too)
 @app.delete("/api/users/{user_id}", status_code=204)
-def delete_user(user_id: int, db: Session = Depends(get_db)) -> Response:
+def delete_user(user_id: int, db: Session = WriteSession) -> Response:
     user = db.get(UserDB, user_id)
     
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     db.delete(user) # <-- triggers cascade="all, delete-orphan" on projects
-    db.commit()
+    invalidate(db, "users", "projects")
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
 @app.put("/api/users/{user_id}", response_model=UserRead, status_code=status.HTTP_200_OK)
-def update_user(user_id: int, updated_user: UserCreate, db: Session = Depends(get_db)) -> Response:
+def update_user(user_id: int, updated_user: UserCreate, db: Session = WriteSession) -> Response:
     """
     Fully update a user's record.
     PUT expects the full payload (name, email, student_id).
     """
-    result = (db.query(UserDB).filter(UserDB.id == user_id).update(updated_user.model_dump())) #attempt to update user with provided fields
-    
-    if not result:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    stmt = update(UserDB).where(UserDB.id == user_id).values(**updated_user.model_dump()).returning(UserDB).execution_options(synchronize_session=False)
+    user = execute_or_rollback(db, stmt, "User update failed (duplicate email or student_id)").scalar_one_or_none() #attempt to update user with provided fields
 
-    commit_or_rollback(db, "User update failed (duplicate email or student_id)")
-
-    user = db.get(UserDB, user_id)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    invalidate(db, "users", "projects")
     return user
 
 @app.patch("/api/users/{user_id}", response_model=UserRead, status_code=status.HTTP_200_OK)
-def patch_user(user_id: int, partial_user: dict, db: Session = Depends(get_db)):
+def patch_user(user_id: int, partial_user: UserPatch, db: Session = WriteSession):
     """
     Partially update a user's record (PATCH = partial fields).
     For example: {"email": "new@example.com"}.
     """
-    result = (db.query(UserDB).filter(UserDB.id == user_id).update(partial_user))  #attempt to update user with provided fields
+    values = partial_user.model_dump(exclude_unset=True)
+    if not values:
+        user = db.get(UserDB, user_id)
+        if not user:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        return user
 
-    if not result:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    stmt = update(UserDB).where(UserDB.id == user_id).values(**values).returning(UserDB).execution_options(synchronize_session=False)
+    user = execute_or_rollback(db, stmt, "User partial update failed").scalar_one_or_none()  #attempt to update user with provided fields
 
-    commit_or_rollback(db, "User partial update failed")
-    user = db.get(UserDB, user_id)
-    return user
\ No newline at end of file
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    invalidate(db, "users", "projects")
+    return user
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
-from sqlalchemy import String, Integer, ForeignKey
+from sqlalchemy import String, Integer, ForeignKey, Index
 
 class Base(DeclarativeBase):
     pass
@@ -15,6 +15,7 @@ class UserDB(Base):
 
 class ProjectDB(Base):
     __tablename__ = "projects"
+    __table_args__ = (Index("ix_projects_owner_id_id", "owner_id", "id"),) # serves owner lookups ordered by id
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String, nullable=False)
     description: Mapped[str] = mapped_column(String, nullable=True)
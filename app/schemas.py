@@ -1,7 +1,7 @@
 # app/schemas.py
 from typing import Annotated, Optional, List
 from annotated_types import Ge, Le
-from pydantic import BaseModel, EmailStr, ConfigDict, StringConstraints, Field
+from pydantic import BaseModel, EmailStr, ConfigDict, StringConstraints, Field, field_validator
 
 NameStr = Annotated[str, StringConstraints(min_length=2, max_length=50)]
 StudentId = Annotated[str, StringConstraints(pattern=r"^S\d{7}$")]
@@ -19,6 +19,22 @@ class UserCreate(BaseModel):
     age: int = Field(gt=18)
     student_id: StudentId
 
+# PATCH /api/users/{id}: only the fields sent are updated
+class UserPatch(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    name: Optional[NameStr] = None
+    email: Optional[EmailStr] = None
+    age: Optional[int] = Field(default=None, gt=18)
+    student_id: Optional[StudentId] = None
+
+    # a field may be left out, but not sent as null (the columns are NOT NULL)
+    @field_validator("name", "email", "age", "student_id")
+    @classmethod
+    def not_null(cls, value):
+        if value is None:
+            raise ValueError("may not be null")
+        return value
+
 class UserRead(BaseModel):
     id: int
     name: NameStr
@@ -48,6 +64,21 @@ class ProjectCreate(BaseModel):
 class ProjectCreateForUser(BaseModel):
     name: ProjectNameStr
     description: Optional[DescStr] = None
+# PATCH /api/projects/{id}: only the fields sent are updated
+class ProjectPatch(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    name: Optional[ProjectNameStr] = None
+    description: Optional[DescStr] = None
+    owner_id: Optional[int] = None
+
+    # description may be cleared with null, the other columns are NOT NULL
+    @field_validator("name", "owner_id")
+    @classmethod
+    def not_null(cls, value):
+        if value is None:
+            raise ValueError("may not be null")
+        return value
+
 class ProjectReadWithOwner(ProjectRead):
     owner: Optional["UserRead"] = None # use selectinload(ProjectDB.owner) when querying
 
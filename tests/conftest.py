@@ -1,10 +1,18 @@
+import os
+# load .env.test (in-memory db) before app.database reads the environment,
+# so startup never touches the real app.db
+os.environ["APP_ENV"] = "test"
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.inmemory import InMemoryBackend
 from app.main import app
-from app.database import get_db
+from app.cache import no_db_session_key_builder
+from app import database
 from app.models import Base
 
 # In-memory SQLite, shared across threads
@@ -14,7 +22,7 @@ engine = create_engine("sqlite+pysqlite://", connect_args={"check_same_thread":
 def _fk_on(dbapi_conn, _):
     dbapi_conn.execute("PRAGMA foreign_keys=ON")
 
-TestingSessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
+TestingSessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False, expire_on_commit=False)
 
 @pytest.fixture(autouse=True) # run before each test
 def _schema():
@@ -23,14 +31,29 @@ def _schema():
     Base.metadata.drop_all(bind=engine)
 
 @pytest.fixture
-def client():
-    def override_get_db():
-        db = TestingSessionLocal()
-        try:
-            yield db
-        finally:
-            db.close()
-    app.dependency_overrides[get_db] = override_get_db
+def queries():
+    # collects every SQL statement sent to the test engine
+    statements = []
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(engine, "before_cursor_execute", _record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", _record)
+
+@pytest.fixture
+def client(monkeypatch):
+    # point the real dependencies at the test engine instead of overriding them
+    monkeypatch.setattr(database, "SessionLocal", TestingSessionLocal)
+    monkeypatch.setattr(database, "ReadOnlySessionLocal", TestingSessionLocal)
     with TestClient(app) as c:
         yield c
-    app.dependency_overrides.clear()
\ No newline at end of file
+
+@pytest.fixture
+def cached_client(client):
+    # swap the disabled dev/test cache for an enabled in-memory one
+    FastAPICache.reset()
+    InMemoryBackend._store.clear()
+    FastAPICache.init(InMemoryBackend(), prefix="api", expire=30, key_builder=no_db_session_key_builder)
+    yield client
+    InMemoryBackend._store.clear()
+    FastAPICache.reset()
@@ -0,0 +1,50 @@
+from fastapi_cache import FastAPICache
+
+def _seed(client):
+    client.post("/api/users", json={"name": "Ann", "email": "ann@example.com", "age": 20, "student_id": "S1234567"})
+    client.post("/api/projects", json={"name": "P0", "owner_id": 1})
+
+def test_second_get_is_a_hit(cached_client):
+    _seed(cached_client)
+    r = cached_client.get("/api/users/1")
+    assert r.headers["x-fastapi-cache"] == "MISS"
+    r = cached_client.get("/api/users/1")
+    assert r.headers["x-fastapi-cache"] == "HIT"
+    assert r.headers["cache-control"] == "no-cache"
+    assert r.json()["name"] == "Ann"
+
+def test_user_patch_invalidates_users_and_projects(cached_client):
+    _seed(cached_client)
+    cached_client.get("/api/users/1")
+    cached_client.get("/api/projects/1")
+    assert cached_client.get("/api/projects/1").headers["x-fastapi-cache"] == "HIT"
+
+    assert cached_client.patch("/api/users/1", json={"name": "Anna"}).status_code == 200
+
+    r = cached_client.get("/api/users/1")
+    assert r.headers["x-fastapi-cache"] == "MISS"
+    assert r.json()["name"] == "Anna"
+    r = cached_client.get("/api/projects/1")
+    assert r.headers["x-fastapi-cache"] == "MISS"
+    assert r.json()["owner"]["name"] == "Anna"
+
+def test_user_delete_invalidates_user_list(cached_client):
+    _seed(cached_client)
+    cached_client.get("/api/users")
+    assert cached_client.get("/api/users").headers["x-fastapi-cache"] == "HIT"
+
+    assert cached_client.delete("/api/users/1").status_code == 204
+
+    r = cached_client.get("/api/users")
+    assert r.headers["x-fastapi-cache"] == "MISS"
+    assert r.json() == []
+    assert cached_client.get("/api/projects/1").status_code == 404
+
+def test_failed_clear_does_not_fail_the_write(cached_client, monkeypatch):
+    _seed(cached_client)
+    async def _down(*args, **kwargs):
+        raise ConnectionError("cache is down")
+    monkeypatch.setattr(FastAPICache, "clear", _down)
+
+    assert cached_client.patch("/api/users/1", json={"name": "Anna"}).status_code == 200
+    assert cached_client.get("/api/users/1").json()["name"] == "Anna"
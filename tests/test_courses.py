@@ -0,0 +1,8 @@
+def test_duplicate_course_is_conflict(client):
+    course = {"code": "CS101", "name": "Intro", "credits": 5}
+    r = client.post("/api/courses", json=course)
+    assert r.status_code == 201
+    assert r.json()["id"] == 1
+    r = client.post("/api/courses", json=course)
+    assert r.status_code == 409
+    assert len(client.get("/api/courses").json()) == 1
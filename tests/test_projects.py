@@ -0,0 +1,60 @@
+def _seed(client):
+    r = client.post("/api/users", json={"name": "Ann", "email": "ann@example.com", "age": 20, "student_id": "S1234567"})
+    owner_id = r.json()["id"]
+    for i in range(3):
+        client.post("/api/projects", json={"name": f"P{i}", "owner_id": owner_id})
+
+def test_list_projects_query_count(client, queries):
+    _seed(client)
+    queries.clear()
+    r = client.get("/api/projects")
+    assert r.status_code == 200
+    assert len(r.json()) == 3
+    assert len(queries) <= 2
+
+def test_get_project_with_owner_query_count(client, queries):
+    _seed(client)
+    queries.clear()
+    r = client.get("/api/projects/1")
+    assert r.status_code == 200
+    assert r.json()["owner"]["name"] == "Ann"
+    assert len(queries) <= 2
+
+def test_update_project_unknown_owner_is_conflict(client):
+    _seed(client)
+    r = client.put("/api/projects/1", json={"name": "P0", "owner_id": 99})
+    assert r.status_code == 409
+    r = client.patch("/api/projects/1", json={"owner_id": 99})
+    assert r.status_code == 409
+    assert client.get("/api/projects/1").json()["owner_id"] == 1
+
+def test_update_missing_project_is_not_found(client):
+    _seed(client)
+    r = client.put("/api/projects/99", json={"name": "P0", "owner_id": 1})
+    assert r.status_code == 404
+    r = client.patch("/api/projects/99", json={"name": "P0"})
+    assert r.status_code == 404
+
+def test_list_paging_bounds(client):
+    _seed(client)
+    assert [p["name"] for p in client.get("/api/projects?limit=2&offset=1").json()] == ["P1", "P2"]
+    assert client.get("/api/users/1/projects?limit=500").status_code == 200
+    for path in ("/api/projects", "/api/users", "/api/users/1/projects", "/api/courses"):
+        assert client.get(f"{path}?limit=501").status_code == 422
+        assert client.get(f"{path}?limit=0").status_code == 422
+        assert client.get(f"{path}?limit=-1").status_code == 422
+        assert client.get(f"{path}?offset=-1").status_code == 422
+
+def test_patch_project_rejects_null_and_extra_keys(client):
+    _seed(client)
+    for body in ({"name": None}, {"owner_id": None}, {"bogus": 1}):
+        assert client.patch("/api/projects/1", json=body).status_code == 422, body
+    r = client.patch("/api/projects/1", json={"description": None})
+    assert r.status_code == 200
+    assert r.json()["description"] is None
+
+def test_patch_project_empty_body_returns_project(client):
+    _seed(client)
+    r = client.patch("/api/projects/1", json={})
+    assert r.status_code == 200
+    assert r.json()["name"] == "P0"
@@ -1,27 +1,41 @@
-import pytest
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+def _add(client, name="Ann", email="ann@example.com", student_id="S1234567"):
+    return client.post("/api/users", json={"name": name, "email": email, "age": 20, "student_id": student_id})
 
-from app.main import app, get_db
-from app.models import Base
+def test_patch_user_rejects_null(client):
+    _add(client)
+    for field in ("name", "email", "age", "student_id"):
+        r = client.patch("/api/users/1", json={field: None})
+        assert r.status_code == 422, field
 
-TEST_DB_URL = "sqlite+pysqlite:///:memory:"
-engine = create_engine(TEST_DB_URL, connect_args={"check_same_thread": False})
-TestingSessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
-Base.metadata.create_all(bind=engine)
+def test_patch_user_rejects_extra_keys(client):
+    _add(client)
+    r = client.patch("/api/users/1", json={"id": 7})
+    assert r.status_code == 422
 
-@pytest.fixture
-def client():
-    def override_get_db():
-        db = TestingSessionLocal()
-        try:
-            yield db
-        finally:
-            db.close()
-    app.dependency_overrides[get_db] = override_get_db
-    with TestClient(app) as c:
-        # hand the client to the test
-        yield c
-        # --- teardown happens when the 'with' block exits ---
+def test_patch_user_empty_body_returns_user(client):
+    _add(client)
+    r = client.patch("/api/users/1", json={})
+    assert r.status_code == 200
+    assert r.json()["name"] == "Ann"
 
+
+def test_duplicate_user_is_conflict(client):
+    assert _add(client).status_code == 201
+    r = _add(client, name="Bob", student_id="S7654321")  # same email
+    assert r.status_code == 409
+    r = _add(client, name="Bob", email="bob@example.com")  # same student_id
+    assert r.status_code == 409
+    assert len(client.get("/api/users").json()) == 1
+
+def test_duplicate_put_is_conflict(client):
+    _add(client)
+    _add(client, name="Bob", email="bob@example.com", student_id="S7654321")
+    r = client.put("/api/users/2", json={"name": "Bob", "email": "ann@example.com", "age": 21, "student_id": "S7654321"})
+    assert r.status_code == 409
+    assert client.get("/api/users/2").json()["email"] == "bob@example.com"
+
+def test_update_unknown_user_is_not_found(client):
+    r = client.put("/api/users/99", json={"name": "Bob", "email": "bob@example.com", "age": 21, "student_id": "S7654321"})
+    assert r.status_code == 404
+    r = client.patch("/api/users/99", json={"age": 30})
+    assert r.status_code == 404